@@ -2,7 +2,7 @@
 
 {
     'name': 'Clover Terminal Integration',
-    'version': '18.0.2.0.0',
+    'version': '18.0.2.1.0',
     'category': 'Point of Sale',
     'summary': 'Clover Flex 4 card payments and Fiserv Transferencias 3.0 QR '
                'displayed on both the Odoo screen and the Clover device',
@@ -56,6 +56,7 @@ Technical Details
     ],
     'data': [
         'security/ir.model.access.csv',
+        'data/ir_cron.xml',
         'views/clover_terminal_views.xml',
         'views/clover_transaction_log_views.xml',
         'views/clover_transaction_views.xml',
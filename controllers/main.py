@@ -2,12 +2,26 @@ import json
 import logging
 
 import requests
+from markupsafe import escape
 
 from odoo import http, _
 from odoo.http import request
 
+from ..models.clover_terminal import _LogVals, _oauth_token_vals
+
 _logger = logging.getLogger(__name__)
 
+_OAUTH_ERROR_PREFIX = (
+    b'<html><body style="font-family:sans-serif;padding:40px;">'
+    b'<h2>Clover OAuth Error</h2>'
+    b'<p style="color:red;">'
+)
+_OAUTH_ERROR_SUFFIX = (
+    b'</p>'
+    b'<p><a href="/odoo">Back to Odoo</a></p>'
+    b'</body></html>'
+)
+
 
 class CloverOAuthController(http.Controller):
     """Handle Clover OAuth callback and exchange code for access token."""
@@ -38,17 +52,20 @@ class CloverOAuthController(http.Controller):
                 + merchant_id
             )
 
-        # Exchange authorization code for access token
-        # Clover v1 OAuth uses GET with query params
-        oauth_base = terminal._get_oauth_base()
-        token_url = f'{oauth_base}/oauth/token'
+        # Exchange the authorization code on Clover's v2 token endpoint (a
+        # JSON POST on the API host). Unlike the legacy GET /oauth/token it
+        # keeps the client secret out of URLs and access logs, and returns
+        # the refresh token and expiry that _refresh_api_token relies on.
+        api_base = terminal.api_base_url
+        token_url = f'{api_base}/oauth/v2/token'
 
         try:
-            resp = requests.get(token_url, params={
+            session = terminal._get_session(api_base)
+            resp = session.post(token_url, json={
                 'client_id': terminal.app_id,
                 'client_secret': terminal.app_secret,
                 'code': code,
-            }, timeout=30, allow_redirects=True)
+            }, timeout=30)
 
             if resp.status_code != 200:
                 _logger.error(
@@ -70,27 +87,27 @@ class CloverOAuthController(http.Controller):
                     '/odoo/clover/oauth/error?msg=No+access_token+in+response'
                 )
 
-            # Store token on the terminal record
-            terminal.write({'api_token': access_token})
+            # Store token (and refresh data, if any) on the credential record
+            terminal._write_credential(_oauth_token_vals(data))
             _logger.info(
                 'Clover OAuth token acquired for terminal %s (merchant %s)',
                 terminal.id, merchant_id,
             )
 
             # Log the token exchange in transaction log
-            request.env['clover.transaction.log'].sudo().create({
-                'terminal_id': terminal.id,
-                'request_id': 'oauth-token-exchange',
-                'endpoint': '/oauth/token',
-                'http_method': 'GET',
-                'http_status': 200,
-                'request_payload': json.dumps({
+            terminal._queue_log(_LogVals(
+                terminal_id=terminal.id,
+                request_id='oauth-token-exchange',
+                endpoint='/oauth/v2/token',
+                http_method='POST',
+                http_status=200,
+                request_payload=json.dumps({
                     'client_id': terminal.app_id,
                     'code': code[:8] + '...',
                 }),
-                'response_payload': json.dumps({'access_token': '***acquired***'}),
-                'status': 'success',
-            })
+                response_payload=json.dumps({'access_token': '***acquired***'}),
+                status='success',
+            ))
 
         except requests.exceptions.RequestException as exc:
             _logger.exception('Clover OAuth token exchange error')
@@ -106,14 +123,14 @@ class CloverOAuthController(http.Controller):
     @http.route('/odoo/clover/oauth/error', type='http', auth='user',
                 website=False, csrf=False)
     def oauth_error(self, msg='Unknown error', **kw):
-        """Display a simple error page for OAuth failures."""
-        return (
-            '<html><body style="font-family:sans-serif;padding:40px;">'
-            '<h2>Clover OAuth Error</h2>'
-            f'<p style="color:red;">{msg}</p>'
-            '<p><a href="/odoo">Back to Odoo</a></p>'
-            '</body></html>'
-        )
+        """Display a simple error page for OAuth failures.
+
+        ``msg`` comes from the query string, so it is HTML-escaped.
+        """
+        body = _OAUTH_ERROR_PREFIX + escape(msg).encode() + _OAUTH_ERROR_SUFFIX
+        return request.make_response(body, headers=[
+            ('Content-Type', 'text/html; charset=utf-8'),
+        ])
 
 
 class FiservQRWebhookController(http.Controller):
@@ -159,7 +176,7 @@ class FiservQRWebhookController(http.Controller):
             or data.get('id')
             or ''
         )
-        _logger.info('Fiserv QR webhook received: %s', json.dumps(data, default=str))
+        _logger.info('Fiserv QR webhook received: %s', raw)
 
         if not order_uuid:
             return request.make_json_response({'received': True})
@@ -177,7 +194,7 @@ class FiservQRWebhookController(http.Controller):
             new_state = state_map.get(status_id, 'approved')
             tx.write({
                 'state': new_state,
-                'raw_response_payload': json.dumps(data, default=str),
+                'raw_response_payload': raw,
             })
 
         return request.make_json_response({'received': True})
@@ -0,0 +1,22 @@
+def migrate(cr, version):
+    """Move OAuth tokens from clover_terminal to clover_terminal_credential."""
+    cr.execute("""
+        SELECT 1 FROM information_schema.columns
+         WHERE table_name = 'clover_terminal' AND column_name = 'api_token'
+    """)
+    if not cr.fetchone():
+        return
+    cr.execute("""
+        INSERT INTO clover_terminal_credential
+               (terminal_id, api_token,
+                create_uid, create_date, write_uid, write_date)
+        SELECT t.id, t.api_token,
+               t.write_uid, now() AT TIME ZONE 'UTC',
+               t.write_uid, now() AT TIME ZONE 'UTC'
+          FROM clover_terminal t
+         WHERE COALESCE(t.api_token, '') != ''
+           AND NOT EXISTS (SELECT 1 FROM clover_terminal_credential c
+                            WHERE c.terminal_id = t.id)
+    """)
+    # Don't leave a stale copy of the secret behind in the old column
+    cr.execute("ALTER TABLE clover_terminal DROP COLUMN api_token")
@@ -1,4 +1,5 @@
 from . import clover_terminal
+from . import clover_terminal_credential
 from . import clover_transaction_log
 from . import clover_transaction
 from . import pos_order
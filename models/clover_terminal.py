@@ -1,37 +1,485 @@
+import atexit
+import functools
+import itertools
 import json
 import logging
-import uuid
-
+import math
+import os
+import queue
+import secrets
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from types import MappingProxyType
+from urllib.parse import urlencode
+
+import psycopg2
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import (
+    HTTPError as Urllib3Error, ProtocolError, ReadTimeoutError,
+)
+from urllib3.util.retry import Retry
 
-from odoo import api, fields, models, _
+from odoo import SUPERUSER_ID, api, fields, models, _
 from odoo.exceptions import UserError
+from odoo.modules.registry import Registry
+from odoo.tools import str2bool
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+try:
+    import h2  # noqa: F401  (httpx needs it for http2=True)
+    import httpx
+except ImportError:
+    httpx = None
 
 _logger = logging.getLogger(__name__)
 
 # Clover environment URLs (regional)
-CLOVER_ENV = {
-    'sandbox': {
-        'api_base': 'https://apisandbox.dev.clover.com',
-        'web_base': 'https://sandbox.dev.clover.com',
-        'oauth_base': 'https://sandbox.dev.clover.com',
-    },
-    'production_na': {
-        'api_base': 'https://api.clover.com',
-        'web_base': 'https://www.clover.com',
-        'oauth_base': 'https://www.clover.com',
-    },
-    'production_eu': {
-        'api_base': 'https://api.eu.clover.com',
-        'web_base': 'https://www.eu.clover.com',
-        'oauth_base': 'https://eu.clover.com',
-    },
-    'production_la': {
-        'api_base': 'https://api.la.clover.com',
-        'web_base': 'https://www.la.clover.com',
-        'oauth_base': 'https://la.clover.com',
-    },
-}
+CloverEnv = namedtuple('CloverEnv', 'api_base web_base oauth_base')
+
+CLOVER_ENV = MappingProxyType({
+    'sandbox': CloverEnv(
+        api_base='https://apisandbox.dev.clover.com',
+        web_base='https://sandbox.dev.clover.com',
+        oauth_base='https://sandbox.dev.clover.com',
+    ),
+    'production_na': CloverEnv(
+        api_base='https://api.clover.com',
+        web_base='https://www.clover.com',
+        oauth_base='https://www.clover.com',
+    ),
+    'production_eu': CloverEnv(
+        api_base='https://api.eu.clover.com',
+        web_base='https://www.eu.clover.com',
+        oauth_base='https://eu.clover.com',
+    ),
+    'production_la': CloverEnv(
+        api_base='https://api.la.clover.com',
+        web_base='https://www.la.clover.com',
+        oauth_base='https://la.clover.com',
+    ),
+})
+
+# Pooled keep-alive sessions, one per API host. Odoo workers are long-lived,
+# so the TLS connection is reused across calls instead of renegotiated.
+_SESSIONS = {}
+_SESSIONS_LOCK = threading.Lock()
+
+
+# When httpx[http2] is installed, Clover REST/Connect calls share one
+# HTTP/2 client so concurrent requests multiplex over a single connection.
+# Built on first use (see _get_httpx_client), so workers that never talk to
+# Clover, and the prefork master, don't carry one.
+_HTTPX_CLIENT = None
+
+
+def _get_httpx_client():
+    global _HTTPX_CLIENT
+    if _HTTPX_CLIENT is None and httpx is not None:
+        with _SESSIONS_LOCK:
+            if _HTTPX_CLIENT is None:
+                _HTTPX_CLIENT = httpx.Client(
+                    http2=True,
+                    timeout=httpx.Timeout(30.0),
+                    limits=httpx.Limits(
+                        max_keepalive_connections=16, max_connections=32),
+                )
+    return _HTTPX_CLIENT
+
+
+_TIMEOUT_ERRORS = (requests.exceptions.Timeout,)
+_CONNECTION_ERRORS = (requests.exceptions.ConnectionError,)
+if httpx is not None:
+    _TIMEOUT_ERRORS += (httpx.TimeoutException,)
+    _CONNECTION_ERRORS += (httpx.ConnectError,)
+
+# Failures while consuming a streamed body, after the status was accepted.
+# requests does not wrap urllib3's errors for resp.raw reads, and a body
+# that is not (complete) JSON fails inside the parser.
+_STREAM_TIMEOUT_ERRORS = (ReadTimeoutError, requests.exceptions.Timeout)
+_STREAM_CONNECTION_ERRORS = (
+    ProtocolError,
+    requests.exceptions.ConnectionError,
+    requests.exceptions.ChunkedEncodingError,
+)
+_STREAM_BODY_ERRORS = (
+    Urllib3Error, requests.exceptions.RequestException, ValueError)
+if ijson is not None:
+    _STREAM_BODY_ERRORS += (ijson.JSONError,)
+
+
+# Audit request ids: a per-process random prefix plus a counter gives 16 hex
+# chars without touching the OS RNG per call. Reseeded in every forked
+# child: prefork workers inherit the master's module state, and would
+# otherwise all issue the same id sequence.
+_REQUEST_ID_NONCE = _REQUEST_ID_COUNTER = None
+
+
+def _reseed_request_ids():
+    global _REQUEST_ID_NONCE, _REQUEST_ID_COUNTER
+    _REQUEST_ID_NONCE = secrets.token_hex(4)
+    _REQUEST_ID_COUNTER = itertools.count()
+
+
+_reseed_request_ids()
+if hasattr(os, 'register_at_fork'):  # POSIX only
+    os.register_at_fork(after_in_child=_reseed_request_ids)
+
+
+def _new_request_id():
+    return f'{_REQUEST_ID_NONCE}{next(_REQUEST_ID_COUNTER) & 0xFFFFFFFF:08x}'
+
+
+# Per-process cache of Connect v1 ping outcomes, so POS-side online checks
+# don't cost a round-trip each: (dbname, terminal id) -> (monotonic expiry,
+# online). One process serves several databases, hence the dbname.
+_DEVICE_CACHE = {}
+_DEVICE_CACHE_TTL = 30
+
+# Calls currently on the wire, so concurrent identical ones in this process
+# share a single round-trip: key -> (done event, [(ok, result or error)]).
+_INFLIGHT = {}
+_INFLIGHT_LOCK = threading.Lock()
+
+
+def _coalesced(key, func, wait=30):
+    """Run ``func()``, or wait for the identical call already in flight.
+
+    Only the leading caller touches the network; concurrent callers with
+    the same ``key`` get its result, or its exception re-raised. A caller
+    that waited longer than ``wait`` seconds runs ``func`` itself.
+    """
+    with _INFLIGHT_LOCK:
+        entry = _INFLIGHT.get(key)
+        leader = entry is None
+        if leader:
+            entry = _INFLIGHT[key] = (threading.Event(), [])
+    done, outcome = entry
+    if not leader:
+        if not done.wait(wait) or not outcome:
+            return func()
+        ok, result = outcome[0]
+        if not ok:
+            raise result
+        return result
+    try:
+        result = func()
+    except Exception as exc:
+        outcome.append((False, exc))
+        raise
+    else:
+        outcome.append((True, result))
+        return result
+    finally:
+        with _INFLIGHT_LOCK:
+            _INFLIGHT.pop(key, None)
+        done.set()
+
+
+# Access tokens this close to ``expires_at`` are refreshed before use.
+_TOKEN_REFRESH_MARGIN = timedelta(minutes=5)
+
+
+def _oauth_token_vals(data):
+    """clover.terminal.credential values from a Clover OAuth token response.
+
+    The v2 endpoints add ``refresh_token`` and ``access_token_expiration``
+    (epoch seconds); the legacy one returns a bare, non-expiring token.
+    """
+    vals = {'api_token': data['access_token']}
+    if data.get('refresh_token'):
+        vals['refresh_token'] = data['refresh_token']
+    if data.get('access_token_expiration'):
+        vals['expires_at'] = datetime.fromtimestamp(
+            int(data['access_token_expiration']), timezone.utc,
+        ).replace(tzinfo=None)
+    return vals
+
+
+# Per-process cache of slow-changing REST v3 reads (merchant, device list):
+# (dbname, environment, merchant id, endpoint) -> (monotonic expiry, body).
+# The dbname keeps a database whose token was revoked from being served
+# another database's bodies for the same merchant.
+_METADATA_CACHE = {}
+
+
+@atexit.register
+def _close_sessions():
+    for session in _SESSIONS.values():
+        session.close()
+    _SESSIONS.clear()
+    if _HTTPX_CLIENT is not None:
+        _HTTPX_CLIENT.close()
+
+
+# Audit rows keep at most this many characters of each body unless the
+# 'clover_terminal_integration.log_full_payloads' system parameter is set.
+_LOG_PAYLOAD_LIMIT = 1024
+
+
+@dataclass(slots=True)
+class _LogVals:
+    """One clover.transaction.log row, filled in as the call progresses.
+
+    Turned into a vals dict (``asdict``) only when the row is written.
+    """
+    terminal_id: int
+    request_id: str
+    endpoint: str
+    http_method: str
+    request_payload: str
+    status: str = 'pending'
+    http_status: int = 0
+    response_payload: str = ''
+    error_message: str = ''
+    idempotency_key: str | None = None
+
+
+# Committed audit rows are handed to a per-process writer thread, so their
+# INSERT never sits on the request thread. Items are (dbname, _LogVals).
+_LOG_QUEUE = queue.Queue(maxsize=10000)
+_LOG_BATCH_SIZE = 200
+_LOG_WRITER = None
+_LOG_WRITER_LOCK = threading.Lock()
+
+
+def _write_log_rows(dbname, rows):
+    with Registry(dbname).cursor() as cr:
+        env = api.Environment(cr, SUPERUSER_ID, {})
+        env['clover.transaction.log'].create([asdict(logv) for logv in rows])
+
+
+def _store_log_rows(dbname, rows):
+    """``_write_log_rows``, falling back to one row at a time on failure.
+
+    One bad row (e.g. its terminal was deleted meanwhile, failing the FK)
+    must not take the rest of its batch with it. A row that fails on its
+    own is logged with its values, so it is never lost silently.
+    """
+    try:
+        _write_log_rows(dbname, rows)
+    except Exception:
+        if len(rows) == 1:
+            _logger.exception('Dropped Clover audit row: %s', asdict(rows[0]))
+            return
+        _logger.warning('Clover audit batch of %s rows failed, retrying '
+                        'row by row', len(rows), exc_info=True)
+        for logv in rows:
+            _store_log_rows(dbname, [logv])
+
+
+def _drain_log_queue(block=True):
+    """Write up to one batch of queued rows; False once the queue is empty."""
+    try:
+        batch = [_LOG_QUEUE.get(block=block)]
+    except queue.Empty:
+        return False
+    while len(batch) < _LOG_BATCH_SIZE:
+        try:
+            batch.append(_LOG_QUEUE.get_nowait())
+        except queue.Empty:
+            break
+    by_db = {}
+    for dbname, logv in batch:
+        by_db.setdefault(dbname, []).append(logv)
+    for dbname, rows in by_db.items():
+        _store_log_rows(dbname, rows)
+    return True
+
+
+def _log_writer():
+    while True:
+        _drain_log_queue()
+
+
+def _enqueue_log_rows(dbname, rows):
+    """Queue rows for the writer thread, writing inline if it is full."""
+    global _LOG_WRITER
+    # Started lazily: threads do not survive the fork into Odoo workers
+    if _LOG_WRITER is None or not _LOG_WRITER.is_alive():
+        with _LOG_WRITER_LOCK:
+            if _LOG_WRITER is None or not _LOG_WRITER.is_alive():
+                _LOG_WRITER = threading.Thread(
+                    target=_log_writer, name='clover-log-writer', daemon=True)
+                _LOG_WRITER.start()
+    for index, logv in enumerate(rows):
+        try:
+            _LOG_QUEUE.put_nowait((dbname, logv))
+        except queue.Full:
+            # Never drop audit rows: fall back to a synchronous insert
+            _store_log_rows(dbname, rows[index:])
+            return
+
+
+@atexit.register
+def _flush_log_queue():
+    while _drain_log_queue(block=False):
+        pass
+
+
+def _check_finite(value):
+    """Raise ValueError on a NaN or infinite float anywhere in ``value``."""
+    if isinstance(value, float):
+        if not math.isfinite(value):
+            raise ValueError(
+                f'Out of range float values are not JSON compliant: {value}')
+    elif isinstance(value, dict):
+        for item in value.values():
+            _check_finite(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            _check_finite(item)
+
+
+def _json_encode(value, default=None):
+    """UTF-8 JSON bytes, via orjson when installed (it releases the GIL).
+
+    Strict by default, like requests' ``json=``: a Decimal amount raises
+    TypeError instead of reaching Clover or Fiserv as a string, and a NaN
+    or infinite amount raises ValueError (orjson would write ``null``, the
+    stdlib ``NaN``). Only audit copies pass ``default=str``, which lets
+    both through. Non-str keys (e.g. ints) are accepted, as the stdlib
+    encoder does.
+    """
+    strict = default is None
+    if orjson is not None:
+        if strict:
+            _check_finite(value)
+        return orjson.dumps(
+            value, default=default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, default=default, allow_nan=not strict).encode()
+
+
+def _iter_json_path(value, path):
+    """Pure-Python ``ijson.items`` for an already parsed body.
+
+    ``path`` uses ijson prefixes: dotted keys, ``item`` for array elements.
+    """
+    if not path:
+        yield value
+        return
+    head, _sep, rest = path.partition('.')
+    if head == 'item':
+        for element in value if isinstance(value, list) else ():
+            yield from _iter_json_path(element, rest)
+    elif isinstance(value, dict) and head in value:
+        yield from _iter_json_path(value[head], rest)
+
+
+def _json_loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _is_json_response(resp):
+    return 'json' in resp.headers.get('Content-Type', '').lower()
+
+
+def _encode_payload(payload):
+    """Wire body for ``payload``; the audit row reuses the same bytes."""
+    return _json_encode(payload) if payload is not None else None
+
+
+def _log_request_payload(data, log_full):
+    if not data or data == b'{}':
+        return ''
+    if not log_full:
+        data = data[:_LOG_PAYLOAD_LIMIT]
+    return data.decode('utf-8', 'replace')
+
+
+def _log_response_payload(resp, log_full):
+    """The body as received (or a prefix of it); never re-serialised."""
+    content = resp.content if log_full else resp.content[:_LOG_PAYLOAD_LIMIT]
+    return content.decode('utf-8', 'replace')
+
+
+def _http_send(call, timeout):
+    """Network half of an API call; no ORM access, safe in a worker thread.
+
+    ``call['client']`` is a requests.Session or an httpx.Client — both take
+    the same keyword arguments (bar the raw body one) and return compatible
+    responses. Returns
+    ``(resp, body)`` with ``body`` always a dict. Transport errors
+    propagate to the caller.
+
+    With ``call['stream']`` (requests only) a successful body is left
+    unread for the caller to consume from ``resp.raw``.
+    """
+    client = call['client']
+    kwargs = {'stream': True} if call.get('stream') else {}
+    if call['data'] is not None:
+        # Pre-encoded rather than json= so requests/httpx skip their stdlib
+        # json pass; the headers already declare application/json.
+        body_arg = 'data' if isinstance(client, requests.Session) else 'content'
+        kwargs[body_arg] = call['data']
+    resp = client.request(
+        method=call['method'],
+        url=call['url'],
+        headers=call['headers'],
+        params=call.get('params'),
+        timeout=timeout,
+        **kwargs,
+    )
+    if call.get('stream') and resp.status_code in (200, 201):
+        return resp, {}
+    body = {}
+    # Only decode declared JSON: HTML error pages from proxies/gateways are
+    # logged as raw text instead of failing inside the JSON parser.
+    if resp.content and _is_json_response(resp):
+        try:
+            body = _json_loads(resp.content)
+        except (ValueError, TypeError):
+            body = {}
+    # Clover sometimes returns non-dict JSON (e.g. bare `true`)
+    if not isinstance(body, dict):
+        body = {'_raw': body}
+    return resp, body
+
+
+_BASE_HEADERS = MappingProxyType({
+    'Content-Type': 'application/json',
+    'Accept': 'application/json',
+})
+
+
+@functools.lru_cache(maxsize=32)
+def _bearer_headers(api_token):
+    """Read-only REST v3 headers for ``api_token``, built once per token.
+
+    Keyed on the token itself rather than the terminal id, so a token
+    refreshed by another worker can never be served stale from here.
+    """
+    return MappingProxyType({
+        **_BASE_HEADERS,
+        'Authorization': f'Bearer {api_token}',
+    })
+
+
+@functools.lru_cache(maxsize=32)
+def _connect_headers(api_token, device_serial, raid):
+    """Read-only Connect v1 headers, built once per token/device/POS id."""
+    return MappingProxyType({
+        **_bearer_headers(api_token),
+        'X-Clover-Device-Id': device_serial,
+        'X-POS-Id': raid,
+    })
+
 
 class CloverTerminal(models.Model):
     _name = 'clover.terminal'
@@ -59,6 +507,14 @@ class CloverTerminal(models.Model):
         default='sandbox',
         tracking=True,
     )
+    api_base_url = fields.Char(
+        string='API Base URL',
+        compute='_compute_base_urls',
+    )
+    oauth_base_url = fields.Char(
+        string='OAuth Base URL',
+        compute='_compute_base_urls',
+    )
     merchant_id = fields.Char(
         string='Merchant ID',
         required=True,
@@ -96,15 +552,27 @@ class CloverTerminal(models.Model):
         tracking=True,
         help='Remote Application ID from App Settings (e.g. 4YFRTCTS6SMFT.R9126BVSN0JYY)',
     )
+    credential_ids = fields.One2many(
+        'clover.terminal.credential', 'terminal_id',
+        string='Credentials',
+        groups='point_of_sale.group_pos_manager',
+    )
+    credential_id = fields.Many2one(
+        'clover.terminal.credential',
+        string='Credential',
+        compute='_compute_credential',
+        groups='point_of_sale.group_pos_manager',
+    )
     api_token = fields.Char(
         string='API Access Token',
-        readonly=True,
+        compute='_compute_credential',
         groups='point_of_sale.group_pos_manager',
         help='OAuth access token — acquired automatically via Authorize flow',
     )
     token_acquired = fields.Boolean(
         string='Token Acquired',
         compute='_compute_token_acquired',
+        search='_search_token_acquired',
     )
     company_id = fields.Many2one(
         'res.company',
@@ -178,61 +646,170 @@ class CloverTerminal(models.Model):
     ]
 
     def init(self):
-        """Clean up partial index from previous version if it exists."""
-        self.env.cr.execute("""
-            DROP INDEX IF EXISTS clover_terminal_unique_active_device;
-        """)
+        """Clean up partial index from previous version if it exists.
+
+        Checked first: DROP INDEX takes an exclusive lock even when there is
+        nothing to drop, and init() runs on every install and upgrade.
+        """
+        self.env.cr.execute(
+            "SELECT 1 FROM pg_indexes "
+            "WHERE indexname = 'clover_terminal_unique_active_device'"
+        )
+        if self.env.cr.fetchone():
+            self.env.cr.execute(
+                "DROP INDEX clover_terminal_unique_active_device")
 
     # ------------------------------------------------------------------
     # Computed fields
     # ------------------------------------------------------------------
 
-    @api.depends('api_token')
+    @api.depends('credential_ids.api_token')
+    def _compute_credential(self):
+        for rec in self:
+            credential = rec.sudo().credential_ids[:1]
+            rec.credential_id = credential
+            rec.api_token = credential.api_token
+
+    @api.depends('credential_ids.api_token')
     def _compute_token_acquired(self):
+        # One query for the whole recordset, without loading the secret
+        with_token = set(self._terminal_ids_with_token(self.ids))
         for rec in self:
-            rec.token_acquired = bool(rec.api_token)
+            rec.token_acquired = rec.id in with_token
+
+    def _search_token_acquired(self, operator, value):
+        if operator not in ('=', '!=') or not isinstance(value, bool):
+            raise UserError(_('Unsupported search on Token Acquired.'))
+        positive = (operator == '=') == value
+        return [('id', 'in' if positive else 'not in',
+                 self._terminal_ids_with_token())]
+
+    def _terminal_ids_with_token(self, terminal_ids=None):
+        domain = [('api_token', '!=', False)]
+        if terminal_ids is not None:
+            domain.append(('terminal_id', 'in', terminal_ids))
+        return self.env['clover.terminal.credential'].sudo().search_fetch(
+            domain, ['terminal_id']).terminal_id.ids
+
+    @api.depends('environment')
+    def _compute_base_urls(self):
+        for rec in self:
+            urls = CLOVER_ENV.get(rec.environment)
+            rec.api_base_url = urls.api_base if urls else False
+            rec.oauth_base_url = urls.oauth_base if urls else False
 
     def _compute_payment_method_count(self):
+        counts = dict(self.env['pos.payment.method']._read_group(
+            [('clover_terminal_id', 'in', self.ids)],
+            ['clover_terminal_id'], ['__count'],
+        ))
         for rec in self:
-            rec.payment_method_count = len(rec.payment_method_ids)
+            rec.payment_method_count = counts.get(rec._origin, 0)
 
     # ------------------------------------------------------------------
     # URL / header helpers
     # ------------------------------------------------------------------
 
-    def _get_api_base(self):
-        self.ensure_one()
-        return CLOVER_ENV[self.environment]['api_base']
+    @classmethod
+    def _get_session(cls, base_url):
+        """Return the shared requests.Session for ``base_url``.
 
-    def _get_oauth_base(self):
-        self.ensure_one()
-        return CLOVER_ENV[self.environment]['oauth_base']
+        Retries only cover connection failures and 502/503/504 on idempotent
+        methods — urllib3 never replays a POST, so payments are not doubled.
+        """
+        session = _SESSIONS.get(base_url)
+        if session is None:
+            with _SESSIONS_LOCK:
+                session = _SESSIONS.get(base_url)
+                if session is None:
+                    adapter = HTTPAdapter(
+                        pool_connections=8,
+                        pool_maxsize=32,
+                        max_retries=Retry(
+                            total=2,
+                            backoff_factor=0.3,
+                            status_forcelist=[502, 503, 504],
+                            raise_on_status=False,
+                        ),
+                    )
+                    session = requests.Session()
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    _SESSIONS[base_url] = session
+        return session
 
     def _get_headers(self):
-        """Headers for Clover REST API v3 (merchant/device management)."""
-        self.ensure_one()
-        return {
-            'Authorization': f'Bearer {self.api_token}',
-            'Content-Type': 'application/json',
-            'Accept': 'application/json',
-        }
+        """Headers for Clover REST API v3 (merchant/device management).
+
+        Like the other private helpers of the request chain, this expects a
+        single record and leaves ``ensure_one`` to the public entry point.
+        """
+        return _bearer_headers(self._current_api_token())
 
     def _get_connect_headers(self, idempotency_key=None):
         """Headers for Connect v1 REST Pay Display API (device control)."""
-        self.ensure_one()
         if not self.device_serial:
             raise UserError(_('Device serial not set.'))
-        headers = {
-            'Authorization': f'Bearer {self.api_token}',
-            'Content-Type': 'application/json',
-            'Accept': 'application/json',
-            'X-Clover-Device-Id': self.device_serial,
-            'X-POS-Id': self.raid,
-        }
+        headers = _connect_headers(
+            self._current_api_token(), self.device_serial, self.raid)
         if idempotency_key:
-            headers['Idempotency-Key'] = idempotency_key
+            return {**headers, 'Idempotency-Key': idempotency_key}
         return headers
 
+    # ------------------------------------------------------------------
+    # Audit log buffering
+    # ------------------------------------------------------------------
+
+    def _log_full_payloads(self):
+        """True when audit rows should store complete request/response bodies."""
+        return str2bool(self.env['ir.config_parameter'].sudo().get_param(
+            'clover_terminal_integration.log_full_payloads', 'False'), False)
+
+    def _queue_log(self, logv):
+        """Buffer a ``_LogVals`` row until the transaction commits.
+
+        Once it commits, ``_flush_log_buffer`` (a postcommit hook) hands the
+        rows to the background writer, which inserts them in batches with
+        its own cursor. A rolled-back transaction drops its rows, as before.
+        """
+        postcommit = self.env.cr.postcommit
+        buffer = postcommit.data.get('clover_log_buffer')
+        if buffer is None:
+            buffer = postcommit.data['clover_log_buffer'] = []
+            postcommit.add(self._flush_log_buffer)
+        buffer.append(logv)
+
+    def _flush_log_buffer(self):
+        buffer = self.env.cr.postcommit.data.pop('clover_log_buffer', None)
+        if buffer:
+            _enqueue_log_rows(self.env.cr.dbname, buffer)
+
+    def _log_call_error(self, call):
+        """Log a failed ``_api_prepare`` call and release its claimed key."""
+        claim = call.get('claim')
+        if claim:
+            # Free the key for a retry. The autonomous row cannot carry it:
+            # its INSERT would wait on this uncommitted delete.
+            claim.unlink()
+            call['logv'].idempotency_key = None
+        self._log_error_autonomous(call['logv'])
+
+    def _log_error_autonomous(self, logv):
+        """Write an error log row in its own, immediately committed cursor.
+
+        Error paths raise UserError right after logging, which rolls back the
+        caller's transaction — a row created there would vanish with it.
+        """
+        vals = asdict(logv)
+        try:
+            with self.env.registry.cursor() as cr:
+                env = api.Environment(cr, SUPERUSER_ID, {})
+                env['clover.transaction.log'].create(vals)
+        except Exception:
+            # e.g. the terminal itself is not committed yet (FK violation)
+            _logger.exception('Could not write Clover error log autonomously')
+            self.env['clover.transaction.log'].sudo().create(vals)
+
     # ------------------------------------------------------------------
     # Core API caller  (all Clover HTTP traffic goes through here)
     # ------------------------------------------------------------------
@@ -246,74 +823,326 @@ class CloverTerminal(models.Model):
         :param connect: if True, use Connect v1 headers (X-Clover-Device-Id,
                         X-POS-Id) instead of plain v3 headers.
         :param idempotency_key: optional idempotency key for financial ops.
+            It must stay the same when the same operation is retried (e.g.
+            derived from the POS order uid): only then can Clover, and the
+            claim below, recognise the retry.
         Returns parsed JSON on success.
         Raises UserError on any failure.
         """
-        self.ensure_one()
-        url = f'{self._get_api_base()}{endpoint}'
-        request_id = uuid.uuid4().hex[:16]
-        headers = (self._get_connect_headers(idempotency_key)
-                   if connect else self._get_headers())
-
-        log_vals = {
-            'terminal_id': self.id,
-            'request_id': request_id,
-            'endpoint': endpoint,
-            'http_method': method.upper(),
-            'request_payload': json.dumps(payload) if payload else '',
-            'status': 'pending',
-        }
-
+        call = self._api_prepare(method, endpoint, payload, connect=connect,
+                                 idempotency_key=idempotency_key)
+        if idempotency_key:
+            claim, prior_body = self._claim_idempotency_key(call['logv'])
+            if not claim:
+                return prior_body
+            call['claim'] = claim
+        return self._api_complete(
+            call, lambda: self._send_with_reauth(call, timeout))
+
+    def _send_with_reauth(self, call, timeout, send=None):
+        """``send()``, replayed once with a refreshed token after a 401.
+
+        ``send`` defaults to ``_http_send``; ``_api_request_many`` passes a
+        worker thread's result, so the refresh and the replay run here,
+        next to the ORM. Only terminals holding a refresh token try: a
+        legacy, non-expiring token has nothing to refresh, so its 401 skips
+        the locked lookup.
+        """
+        resp, body = send() if send else _http_send(call, timeout)
+        if resp.status_code == 401 and self.sudo().credential_id.refresh_token:
+            stale = call['headers']['Authorization'].removeprefix('Bearer ')
+            token = self._refresh_api_token(stale, force=True)
+            if token and token != stale:
+                call['headers'] = {**call['headers'],
+                                   'Authorization': f'Bearer {token}'}
+                resp, body = _http_send(call, timeout)
+        return resp, body
+
+    def _claim_idempotency_key(self, logv):
+        """Reserve ``logv.idempotency_key`` in the caller's transaction.
+
+        The pending log row is inserted before the call, so the key commits
+        together with whatever the caller does with the result, and a replay
+        hits the unique index instead of Clover. Returns ``(row, None)``, or
+        ``(empty, body)`` with the recorded body of an earlier success.
+        Only these claimed rows carry a key, so the unique index never
+        rejects an ordinary audit row.
+        """
+        Log = self.env['clover.transaction.log'].sudo()
         try:
-            resp = requests.request(
-                method=method,
-                url=url,
-                headers=headers,
-                json=payload,
-                timeout=timeout,
-            )
+            with self.env.cr.savepoint():
+                return Log.create(asdict(logv)), None
+        except psycopg2.errors.UniqueViolation:
+            prior = Log.search([
+                ('terminal_id', '=', self.id),
+                ('idempotency_key', '=', logv.idempotency_key),
+            ], limit=1)
+            if prior.status != 'success':
+                raise UserError(_(
+                    'A Clover request with idempotency key %s is already '
+                    'in progress.', logv.idempotency_key))
             try:
-                body = resp.json() if resp.content else {}
+                body = _json_loads(prior.response_payload or '{}')
             except (ValueError, TypeError):
-                body = {}
-            # Clover sometimes returns non-dict JSON (e.g. bare `true`)
-            if not isinstance(body, dict):
-                body = {'_raw': body}
-            log_vals['response_payload'] = json.dumps(body, default=str)
-            log_vals['http_status'] = resp.status_code
+                # a row claimed before full bodies were kept, stored cut
+                raise UserError(_(
+                    'The Clover request with idempotency key %s already '
+                    'succeeded, but its response cannot be replayed.',
+                    logv.idempotency_key)) from None
+            return Log, body if isinstance(body, dict) else {'_raw': body}
+
+    @api.model
+    def _api_request_many(self, calls, timeout=30, connect=False):
+        """Send several Clover calls concurrently, possibly across terminals.
+
+        :param calls: list of ``(terminal, method, endpoint, payload)``.
+        Returns a list aligned with ``calls`` holding each parsed JSON body,
+        or the UserError that call would have raised. ``_api_request`` is
+        the single-call form (``_api_request_many([...])[0]``, raising
+        instead of returning the error); it stays inline so one call never
+        pays for a thread.
+        """
+        results = [None] * len(calls)
+        prepared = []
+        for index, (terminal, method, endpoint, payload) in enumerate(calls):
+            try:
+                call = terminal._api_prepare(method, endpoint, payload,
+                                             connect=connect)
+            except UserError as exc:
+                results[index] = exc
+            else:
+                prepared.append((index, terminal, call))
+
+        if len(prepared) > 1:
+            # Network only in the pool; every ORM access stays on this thread
+            with ThreadPoolExecutor(max_workers=min(8, len(prepared))) as executor:
+                futures = [executor.submit(_http_send, call, timeout)
+                           for _index, _terminal, call in prepared]
+            sends = [future.result for future in futures]
+        else:
+            sends = [functools.partial(_http_send, call, timeout)
+                     for _index, _terminal, call in prepared]
+
+        for (index, terminal, call), send in zip(prepared, sends):
+            try:
+                results[index] = terminal._api_complete(call, functools.partial(
+                    terminal._send_with_reauth, call, timeout, send))
+            except UserError as exc:
+                results[index] = exc
+        return results
+
+    def _api_request_streamed(self, method, endpoint, payload=None,
+                              item_path='items.item', timeout=30):
+        """Like ``_api_request``, but yield the items at ``item_path`` one by one.
+
+        With ijson installed the body is parsed straight off the socket, so
+        peak memory is one item rather than the whole listing; without it
+        the body is parsed at once and walked. The request is sent on first
+        iteration, and the audit row records the status but not the body.
+        It is written once the body is consumed or the generator closed; a
+        read or parse failure midway logs an error row instead and raises
+        the same UserError messages as ``_api_complete``.
+        """
+        call = self._api_prepare(method, endpoint, payload)
+        # resp.raw is requests/urllib3 specific, so never the httpx client
+        call.update(client=self._get_session(self.api_base_url), stream=True)
+        resp = self._api_complete(
+            call, lambda: self._send_with_reauth(call, timeout))
+        logv = call['logv']
+        try:
+            with resp:
+                if ijson is not None:
+                    resp.raw.decode_content = True
+                    yield from ijson.items(resp.raw, item_path, use_float=True)
+                else:
+                    body = _json_loads(resp.content) if resp.content else {}
+                    yield from _iter_json_path(body, item_path)
+        except GeneratorExit:
+            # the caller stopped early, e.g. at the device it looked for
+            self._queue_log(logv)
+            raise
+        except _STREAM_TIMEOUT_ERRORS:
+            logv.status, logv.error_message = 'timeout', 'Response read timed out'
+            message = _('Clover request timed out. Check device/network.')
+        except _STREAM_CONNECTION_ERRORS as exc:
+            logv.status = 'error'
+            logv.error_message = f'Connection lost reading the response: {exc}'
+            message = _('Cannot reach Clover API. Check network.')
+        except _STREAM_BODY_ERRORS as exc:
+            logv.status = 'error'
+            logv.error_message = f'Unreadable response body: {exc}'
+            message = _('Clover error: %s', exc)
+        else:
+            self._queue_log(logv)
+            return
+        self._log_call_error(call)
+        raise UserError(message)
+
+    def _cached_get(self, endpoint, ttl=300):
+        """GET ``endpoint``, reusing a body fetched less than ``ttl`` s ago."""
+        return self._cached_get_many([endpoint], ttl=ttl)[0]
+
+    def _cached_get_many(self, endpoints, ttl=300, raise_error=True):
+        """Cached GETs of several endpoints; misses are fetched concurrently.
+
+        Raises the first UserError among the misses, like ``_api_request``.
+        With ``raise_error=False`` a failed endpoint gets its UserError in
+        the returned list instead, and nothing is cached for it.
+        """
+        bodies = {}
+        misses = []
+        for endpoint in endpoints:
+            body = self._get_cached_body(endpoint)
+            if body is not None:
+                bodies[endpoint] = body
+            else:
+                misses.append(endpoint)
+        if misses:
+            results = self._api_request_many(
+                [(self, 'GET', endpoint, None) for endpoint in misses])
+            if raise_error:
+                for result in results:
+                    if isinstance(result, UserError):
+                        raise result
+            expiry = time.monotonic() + ttl
+            for endpoint, body in zip(misses, results):
+                bodies[endpoint] = body
+                if isinstance(body, UserError):
+                    continue
+                _METADATA_CACHE[
+                    (self.env.cr.dbname, self.environment, self.merchant_id,
+                     endpoint)
+                ] = (expiry, body)
+        return [bodies[endpoint] for endpoint in endpoints]
+
+    def _get_cached_body(self, endpoint):
+        """Body cached for ``endpoint`` and still fresh, else None."""
+        cached = _METADATA_CACHE.get(
+            (self.env.cr.dbname, self.environment, self.merchant_id, endpoint))
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+        return None
+
+    def _invalidate_metadata_cache(self):
+        dbname = self.env.cr.dbname
+        for rec in self:
+            prefix = (dbname, rec.environment, rec.merchant_id)
+            for key in [key for key in _METADATA_CACHE if key[:3] == prefix]:
+                _METADATA_CACHE.pop(key, None)
 
-            if resp.status_code in (200, 201):
-                log_vals['status'] = 'success'
-                self.env['clover.transaction.log'].sudo().create(log_vals)
-                return body
+    def _api_prepare(self, method, endpoint, payload=None, connect=False,
+                     idempotency_key=None):
+        """Read everything a Clover call needs from the record.
 
-            error_msg = body.get('message') or resp.text[:500]
-            log_vals.update(status='error', error_message=error_msg)
-            self.env['clover.transaction.log'].sudo().create(log_vals)
-            raise UserError(_(
-                'Clover API %(status)s: %(msg)s',
-                status=resp.status_code,
-                msg=error_msg,
-            ))
+        The returned dict is all ``_http_send`` touches, so the network part
+        can run in a worker thread while ORM access stays on this one.
+        Single record; the first field read raises otherwise.
+        """
+        base_url = self.api_base_url
+        request_id = _new_request_id()
+        http_method = method.upper()
+        if connect:
+            headers = self._get_connect_headers(idempotency_key)
+        elif idempotency_key:
+            headers = {**self._get_headers(), 'Idempotency-Key': idempotency_key}
+        else:
+            headers = self._get_headers()
+        log_full = self._log_full_payloads()
+        logv = _LogVals(
+            terminal_id=self.id,
+            request_id=request_id,
+            endpoint=endpoint,
+            http_method=http_method,
+            request_payload='',
+            idempotency_key=idempotency_key,
+        )
+        return {
+            'client': _get_httpx_client() or self._get_session(base_url),
+            'method': method,
+            'url': f'{base_url}{endpoint}',
+            'headers': headers,
+            'data': self._encode_call_payload(payload, logv, log_full),
+            'log_full': log_full,
+            'logv': logv,
+        }
+
+    def _encode_call_payload(self, payload, logv, log_full):
+        """Wire body for ``payload``; also fills ``logv.request_payload``.
 
-        except requests.exceptions.Timeout:
-            log_vals.update(status='timeout', error_message='Request timed out')
-            self.env['clover.transaction.log'].sudo().create(log_vals)
-            raise UserError(_('Clover request timed out. Check device/network.'))
+        An unserialisable payload is a programming error and raises
+        TypeError (ValueError for NaN/infinity) as before, but first leaves an error audit row with a
+        lenient (``default=str``) copy of what was about to be sent.
+        """
+        try:
+            data = _encode_payload(payload)
+        except (TypeError, ValueError) as exc:
+            logv.request_payload = _log_request_payload(
+                _json_encode(payload, default=str), log_full)
+            logv.status = 'error'
+            logv.error_message = f'Payload is not JSON serialisable: {exc}'
+            self._log_error_autonomous(logv)
+            raise
+        logv.request_payload = _log_request_payload(data, log_full)
+        return data
 
-        except requests.exceptions.ConnectionError:
-            log_vals.update(status='error', error_message='Connection refused')
-            self.env['clover.transaction.log'].sudo().create(log_vals)
-            raise UserError(_('Cannot reach Clover API. Check network.'))
+    def _api_complete(self, call, send):
+        """Run ``send`` for a prepared call, then log it and map failures.
 
+        ``send`` returns ``(resp, body)`` — ``_http_send`` itself or a
+        future's ``result`` — and may raise any transport exception.
+        Returns the body, or the open response for a streamed call.
+        Every failure leaves through the single log-and-raise exit at the
+        end; ``call['service'] == 'fiserv'`` selects the Fiserv messages.
+        """
+        logv = call['logv']
+        fiserv = call.get('service') == 'fiserv'
+        try:
+            resp, body = send()
+        except _TIMEOUT_ERRORS:
+            logv.status, logv.error_message = 'timeout', 'Request timed out'
+            message = (_('Fiserv QR request timed out.') if fiserv
+                       else _('Clover request timed out. Check device/network.'))
+        except _CONNECTION_ERRORS:
+            logv.status, logv.error_message = 'error', 'Connection refused'
+            message = (_('Cannot reach Fiserv QR API. Check network.') if fiserv
+                       else _('Cannot reach Clover API. Check network.'))
         except UserError:
             raise
-
         except Exception as exc:
-            _logger.exception('Clover API unexpected error')
-            log_vals.update(status='error', error_message=str(exc))
-            self.env['clover.transaction.log'].sudo().create(log_vals)
-            raise UserError(_('Clover error: %s', exc))
+            _logger.exception('%s unexpected error',
+                              'Fiserv QR API' if fiserv else 'Clover API')
+            logv.status, logv.error_message = 'error', str(exc)
+            message = (_('Fiserv QR error: %s', exc) if fiserv
+                       else _('Clover error: %s', exc))
+        else:
+            streamed = call.get('stream') and resp.status_code in (200, 201)
+            # A claimed row is what a replay returns: always the full body
+            logv.response_payload = '' if streamed else _log_response_payload(
+                resp, call['log_full'] or bool(call.get('claim')))
+            logv.http_status = resp.status_code
+
+            if resp.status_code in (200, 201):
+                logv.status = 'success'
+                if streamed:
+                    # logged by _api_request_streamed once the body is read
+                    return resp
+                if call.get('claim'):
+                    call['claim'].write(asdict(logv))
+                else:
+                    self._queue_log(logv)
+                return body
+
+            error_msg = body.get('message') or resp.text[:500]
+            logv.status, logv.error_message = 'error', error_msg
+            if fiserv:
+                message = _('Fiserv QR API %(status)s: %(msg)s',
+                            status=resp.status_code, msg=error_msg)
+            else:
+                message = _('Clover API %(status)s: %(msg)s',
+                            status=resp.status_code, msg=error_msg)
+
+        self._log_call_error(call)
+        raise UserError(message)
 
     # ------------------------------------------------------------------
     # OAuth authorization
@@ -324,7 +1153,8 @@ class CloverTerminal(models.Model):
 
         After merchant approval Clover redirects back to
         ``/odoo/clover/oauth/callback`` where the code is exchanged
-        for an access token.
+        for an access token. The v2 flow is used throughout: its codes are
+        what ``/oauth/v2/token`` accepts.
         """
         self.ensure_one()
         if not self.app_id or not self.app_secret:
@@ -334,52 +1164,215 @@ class CloverTerminal(models.Model):
 
         base_url = self.env['ir.config_parameter'].sudo().get_param('web.base.url')
         callback = f'{base_url}/odoo/clover/oauth/callback'
-        oauth_base = self._get_oauth_base()
-        authorize_url = (
-            f'{oauth_base}/oauth/authorize'
-            f'?client_id={self.app_id}'
-            f'&merchant_id={self.merchant_id}'
-            f'&redirect_uri={callback}'
-            f'&response_type=code'
-        )
+        oauth_base = self.oauth_base_url
+        query = urlencode({
+            'client_id': self.app_id,
+            'merchant_id': self.merchant_id,
+            'redirect_uri': callback,
+            'response_type': 'code',
+        })
+        authorize_url = f'{oauth_base}/oauth/v2/authorize?{query}'
         return {
             'type': 'ir.actions.act_url',
             'url': authorize_url,
             'target': 'new',
         }
 
+    def _write_credential(self, vals):
+        """Write OAuth token values on the terminal's credential record."""
+        self.ensure_one()
+        # Bodies and ping outcomes cached under the old token may not hold
+        # with the new one
+        self._invalidate_metadata_cache()
+        _DEVICE_CACHE.pop((self.env.cr.dbname, self.id), None)
+        credential = self.sudo().credential_id
+        # the written values supersede a token kept by _remember_api_token
+        self.env.cr.cache.pop(('clover_api_token', credential.id), None)
+        if credential:
+            credential.write(vals)
+        else:
+            self.env['clover.terminal.credential'].sudo().create(
+                dict(vals, terminal_id=self.id))
+
+    def _current_api_token(self):
+        """Access token for the next call, refreshed first if about to expire."""
+        credential = self.sudo().credential_id
+        api_token, expires_at = self.env.cr.cache.get(
+            ('clover_api_token', credential.id),
+            (credential.api_token, credential.expires_at))
+        if (credential.refresh_token and expires_at
+                and expires_at - fields.Datetime.now()
+                < _TOKEN_REFRESH_MARGIN):
+            return self._refresh_api_token(api_token) or api_token
+        return api_token
+
+    def _remember_api_token(self, credential_id, api_token, expires_at):
+        """Keep a token read or committed by ``_refresh_api_token``.
+
+        The caller's transaction keeps its snapshot of the credential row,
+        so without this every later call in it would see the old token and
+        go back through the locked refresh (after a 401, even a wasted
+        round-trip). ``_current_api_token`` checks this first.
+        """
+        self.env.cr.cache[('clover_api_token', credential_id)] = (
+            api_token, expires_at)
+
+    def _refresh_api_token(self, stale_token, force=False):
+        """Trade the refresh token for a new access token; return the token.
+
+        Runs in its own committed cursor with the credential row locked:
+        refresh tokens rotate, so a new one rolled back with the caller's
+        transaction would be lost, and concurrent workers must not spend
+        the same one twice. A worker that finds the token already replaced
+        uses the new one. Returns False when the refresh fails.
+        """
+        credential_id = self.sudo().credential_id.id
+        if not credential_id:
+            return False
+        base_url = self.api_base_url
+        try:
+            with self.env.registry.cursor() as cr:
+                # Bounded wait: enough for a concurrent refresh, and no
+                # deadlock if our own transaction already holds the row
+                cr.execute("SET LOCAL lock_timeout = '5s'")
+                cr.execute(
+                    'SELECT api_token, refresh_token, expires_at '
+                    'FROM clover_terminal_credential WHERE id = %s FOR UPDATE',
+                    [credential_id],
+                )
+                row = cr.fetchone()
+                if not row:
+                    return False
+                api_token, refresh_token, expires_at = row
+                still_valid = expires_at and (
+                    expires_at - fields.Datetime.now() >= _TOKEN_REFRESH_MARGIN)
+                if (api_token != stale_token or not refresh_token
+                        or (still_valid and not force)):
+                    # already refreshed (by another worker, or before we
+                    # got the lock), or nothing to refresh with
+                    self._remember_api_token(
+                        credential_id, api_token, expires_at)
+                    return api_token
+                resp = self._get_session(base_url).post(
+                    f'{base_url}/oauth/v2/refresh',
+                    json={'client_id': self.app_id,
+                          'refresh_token': refresh_token},
+                    timeout=30,
+                )
+                if resp.status_code != 200:
+                    _logger.warning(
+                        'Clover token refresh failed for terminal %s: %s %s',
+                        self.id, resp.status_code, resp.text[:500],
+                    )
+                    return False
+                vals = _oauth_token_vals(_json_loads(resp.content))
+                env = api.Environment(cr, SUPERUSER_ID, {})
+                env['clover.terminal.credential'].browse(credential_id).write(vals)
+                self._remember_api_token(
+                    credential_id, vals['api_token'], vals.get('expires_at'))
+                _logger.info('Clover token refreshed for terminal %s', self.id)
+                return vals['api_token']
+        except (requests.exceptions.RequestException, psycopg2.Error,
+                ValueError, KeyError):
+            _logger.exception('Clover token refresh error for terminal %s', self.id)
+            return False
+
     # ------------------------------------------------------------------
     # Connection testing  (Phase 1 deliverable)
     # ------------------------------------------------------------------
 
-    def _resolve_device_by_serial(self):
-        """Find Clover device UUID by serial number."""
+    def _resolve_device_by_serial(self, known=None):
+        """Clover device entry for ``device_serial``; UserError if none.
+
+        The entry of a stored ``clover_device_id`` is tried first: ``known``
+        when the caller already fetched it (``{}`` if that failed), else a
+        single-device GET. Failing that, the merchant's ``/devices`` listing
+        is scanned: from the cache when ``_resolve_devices_by_serial`` left a
+        fresh copy there, else streamed and abandoned at the first match, so
+        a large fleet is never parsed (or held) whole to find one entry. The
+        streamed scan does not cache: it usually stops before the end.
+        """
         self.ensure_one()
-        devices = self._api_request(
-            'GET', f'/v3/merchants/{self.merchant_id}/devices',
-        )
-        for dev in devices.get('elements', []):
-            if dev.get('serial') == self.device_serial:
+        endpoint = f'/v3/merchants/{self.merchant_id}/devices'
+        if known is None and self.clover_device_id:
+            try:
+                known = self._cached_get(f'{endpoint}/{self.clover_device_id}')
+            except UserError:
+                # e.g. 404 once the device was removed from the merchant
+                known = {}
+        if known and known.get('serial') == self.device_serial:
+            return known
+        listing = self._get_cached_body(endpoint)
+        if listing is not None:
+            return self._pick_device(listing.get('elements', []))
+        devices = self._api_request_streamed(
+            'GET', endpoint, item_path='elements.item')
+        # closing() releases a half-read streamed response
+        with closing(devices):
+            return self._pick_device(devices)
+
+    def _pick_device(self, devices):
+        """Return the entry of ``devices`` matching our serial, else raise.
+
+        ``devices`` is any iterable of ``/devices`` entries; iteration stops
+        at the first match.
+        """
+        # Read once: the loop can run over every device of a merchant chain
+        serial = self.device_serial
+        for dev in devices:
+            if dev.get('serial') == serial:
                 return dev
         raise UserError(_(
             'No device with serial "%(serial)s" found for this merchant.',
-            serial=self.device_serial,
+            serial=serial,
         ))
 
+    def _resolve_devices_by_serial(self):
+        """Match every terminal in ``self`` to its Clover device at once.
+
+        Each merchant's ``/devices`` listing is fetched once (and cached, see
+        ``_cached_get``) and indexed by serial, so resolving T terminals over
+        D devices is O(T + D). Returns ``{terminal_id: device or None}``.
+        """
+        indexes = {}
+        result = {}
+        for terminal in self:
+            key = (terminal.environment, terminal.merchant_id)
+            if key not in indexes:
+                devices = terminal._cached_get(
+                    f'/v3/merchants/{terminal.merchant_id}/devices')
+                indexes[key] = {dev.get('serial'): dev
+                                for dev in devices.get('elements', [])}
+            result[terminal.id] = indexes[key].get(terminal.device_serial)
+        return result
+
     def action_test_connection(self):
         """Fetch merchant info, resolve device, and optionally ping via Connect v1."""
         self.ensure_one()
         if not self.api_token:
             raise UserError(_('No API token. Click Authorize first.'))
+        merchant_id = self.merchant_id
+        serial = self.device_serial
         try:
-            # 1) Verify merchant via REST v3
-            merchant = self._api_request(
-                'GET', f'/v3/merchants/{self.merchant_id}',
-            )
+            # 1) Verify merchant via REST v3. On a re-test the stored device
+            #    id makes the device endpoint known up front as well, so both
+            #    GETs share one round-trip of wall time.
+            merchant_endpoint = f'/v3/merchants/{merchant_id}'
+            endpoints = [merchant_endpoint]
+            if self.clover_device_id:
+                endpoints.append(
+                    f'{merchant_endpoint}/devices/{self.clover_device_id}')
+            merchant, *known = self._cached_get_many(
+                endpoints, raise_error=False)
+            if isinstance(merchant, UserError):
+                raise merchant
             merchant_name = merchant.get('name', '?')
 
-            # 2) Find device by serial number → get UUID
-            device = self._resolve_device_by_serial()
+            # 2) Find device by serial number → get UUID. A failed or
+            #    mismatching device GET falls back to the listing scan.
+            known = known[0] if known else {}
+            device = self._resolve_device_by_serial(
+                {} if isinstance(known, UserError) else known)
             clover_device_id = device.get('id')
             device_model = device.get('productName', device.get('model', ''))
 
@@ -420,7 +1413,7 @@ class CloverTerminal(models.Model):
                         'message': _(
                             'Merchant: %(merchant)s — Device: %(serial)s (%(model)s) — Ping OK',
                             merchant=merchant_name,
-                            serial=self.device_serial,
+                            serial=serial,
                             model=device_model or 'Flex',
                         ),
                         'type': 'success',
@@ -444,7 +1437,7 @@ class CloverTerminal(models.Model):
                             'Merchant: %(merchant)s — Device: %(serial)s (%(model)s) verified. '
                             'Device ping failed — start Cloud Pay Display on the terminal.',
                             merchant=merchant_name,
-                            serial=self.device_serial,
+                            serial=serial,
                             model=device_model or 'Flex',
                         ),
                         'type': 'warning',
@@ -479,22 +1472,30 @@ class CloverTerminal(models.Model):
         self.ensure_one()
         if self.state not in ('testing', 'error', 'inactive'):
             raise UserError(_('Test the connection first.'))
+        self._invalidate_metadata_cache()
         self.write({'state': 'active', 'last_error': False})
 
     def action_deactivate(self):
         """Deactivate terminal — keeps record visible but unusable."""
         self.ensure_one()
+        _DEVICE_CACHE.pop((self.env.cr.dbname, self.id), None)
         self.write({'state': 'inactive'})
 
     def action_reset_draft(self):
         """Reset terminal back to draft."""
         self.ensure_one()
+        _DEVICE_CACHE.pop((self.env.cr.dbname, self.id), None)
+        self._invalidate_metadata_cache()
         self.write({
             'state': 'draft',
             'last_error': False,
-            'api_token': False,
             'clover_device_id': False,
         })
+        self._write_credential({
+            'api_token': False,
+            'refresh_token': False,
+            'expires_at': False,
+        })
 
     # ------------------------------------------------------------------
     # Connect v1 device operations
@@ -505,16 +1506,20 @@ class CloverTerminal(models.Model):
         self.ensure_one()
         if not self.api_token:
             raise UserError(_('No API token. Run Authorize first.'))
-        result = self._api_request(
+        # A test-connection and a health check often ping together. The
+        # dbname keeps same-id terminals of other databases apart.
+        key = (self.env.cr.dbname, self.id, 'ping')
+        result = _coalesced(key, lambda: self._api_request(
             'POST', '/connect/v1/device/ping',
             connect=True, timeout=15,
-        )
-        self.last_ping = fields.Datetime.now()
+        ))
+        self._write_last_ping()
         return result
 
     def reset_device(self):
         """Reset device to idle via Connect v1."""
         self.ensure_one()
+        _DEVICE_CACHE.pop((self.env.cr.dbname, self.id), None)
         return self._api_request(
             'PUT', '/connect/v1/device/reset',
             connect=True, timeout=15,
@@ -523,13 +1528,73 @@ class CloverTerminal(models.Model):
     def check_device_online(self):
         """Return True/False whether device responds via Connect v1 ping."""
         self.ensure_one()
-        if not self.device_serial or not self.api_token:
-            return False
+        return self._check_devices_online()[self.id]
+
+    def _check_devices_online(self):
+        """Ping every terminal in ``self`` concurrently via Connect v1.
+
+        Returns ``{terminal_id: bool}``. Outcomes are reused for
+        ``_DEVICE_CACHE_TTL`` seconds, so ``last_ping`` is only written on a
+        cache miss. A terminal whose ``last_ping`` (from any worker) is
+        recent enough counts as online without a call. Terminals without a
+        serial or API token are reported offline before either shortcut.
+        """
+        dbname = self.env.cr.dbname
+        now = time.monotonic()
+        fresh_since = fields.Datetime.now() - timedelta(
+            seconds=self._online_fresh_seconds())
+        online = {}
+        to_ping = self.browse()
+        for terminal in self:
+            cached = _DEVICE_CACHE.get((dbname, terminal.id))
+            if not (terminal.device_serial and terminal.api_token):
+                # checked first: a reset terminal keeps its last_ping
+                online[terminal.id] = False
+            elif cached and cached[0] > now:
+                online[terminal.id] = cached[1]
+            elif terminal.last_ping and terminal.last_ping > fresh_since:
+                online[terminal.id] = True
+            else:
+                to_ping |= terminal
+        if not to_ping:
+            return online
+
+        results = self._api_request_many(
+            [(terminal, 'POST', '/connect/v1/device/ping', None)
+             for terminal in to_ping],
+            timeout=15, connect=True,
+        )
+        expiry = time.monotonic() + _DEVICE_CACHE_TTL
+        for terminal, result in zip(to_ping, results):
+            online[terminal.id] = not isinstance(result, UserError)
+            _DEVICE_CACHE[dbname, terminal.id] = (expiry, online[terminal.id])
+        reachable = to_ping.filtered(lambda t: online[t.id])
+        if reachable:
+            reachable._write_last_ping()
+        return online
+
+    def _online_fresh_seconds(self):
+        """How recent a ``last_ping`` must be to skip the online check."""
+        value = self.env['ir.config_parameter'].sudo().get_param(
+            'clover_terminal_integration.online_fresh_seconds', '10')
         try:
-            self.ping_device_connect()
-            return True
-        except UserError:
-            return False
+            return int(value)
+        except ValueError:
+            return 10
+
+    def _write_last_ping(self):
+        """Stamp ``last_ping`` without mail.thread tracking bookkeeping.
+
+        ``last_ping`` is not tracked, but a plain write still snapshots every
+        tracked field for the change-tracking diff; pings are frequent.
+        """
+        self.with_context(tracking_disable=True).write(
+            {'last_ping': fields.Datetime.now()})
+
+    @api.model
+    def _cron_check_devices_online(self):
+        """Scheduled sweep: ping every active terminal in one concurrent batch."""
+        self.search([('state', '=', 'active')])._check_devices_online()
 
     # ==================================================================
     # Fiserv QR Estático API (Transferencias 3.0)
@@ -537,7 +1602,6 @@ class CloverTerminal(models.Model):
 
     def _fiserv_qr_base(self):
         """Return the Fiserv QR API base URL for the configured environment."""
-        self.ensure_one()
         if self.fiserv_qr_environment == 'production':
             return 'https://connect.latam.fiservapis.com/qr-latam-api/v1'
         return 'https://connect-cert.latam.fiservapis.com/qr-latam-api/v1'
@@ -548,66 +1612,35 @@ class CloverTerminal(models.Model):
         Auth is the raw JWT token in the Authorization header (no prefix).
         Every call is audit-logged to clover.transaction.log.
         Returns parsed JSON dict. Raises UserError on failure.
+        Called from the ``_fiserv_*`` methods, which check ``ensure_one``.
         """
-        self.ensure_one()
         if not self.fiserv_qr_token:
             raise UserError(_('No Fiserv QR token configured on this terminal.'))
-        url = f'{self._fiserv_qr_base()}{path}'
-        request_id = uuid.uuid4().hex[:16]
-        headers = {
-            'Authorization': self.fiserv_qr_token,
-            'Content-Type': 'application/json',
-            'Accept': 'application/json',
-        }
-        log_vals = {
-            'terminal_id': self.id,
-            'request_id': request_id,
-            'endpoint': path,
-            'http_method': method.upper(),
-            'request_payload': json.dumps(payload) if payload else '',
-            'status': 'pending',
+        base_url = self._fiserv_qr_base()
+        url = f'{base_url}{path}'
+        request_id = _new_request_id()
+        headers = {**_BASE_HEADERS, 'Authorization': self.fiserv_qr_token}
+        log_full = self._log_full_payloads()
+        logv = _LogVals(
+            terminal_id=self.id,
+            request_id=request_id,
+            endpoint=path,
+            http_method=method.upper(),
+            request_payload='',
+        )
+        data = self._encode_call_payload(payload, logv, log_full)
+        call = {
+            'client': self._get_session(base_url),
+            'service': 'fiserv',
+            'method': method,
+            'url': url,
+            'headers': headers,
+            'data': data,
+            'params': params,
+            'log_full': log_full,
+            'logv': logv,
         }
-        try:
-            resp = requests.request(
-                method=method, url=url, headers=headers,
-                json=payload, params=params, timeout=timeout,
-            )
-            try:
-                body = resp.json() if resp.content else {}
-            except (ValueError, TypeError):
-                body = {}
-            if not isinstance(body, dict):
-                body = {'_raw': body}
-            log_vals['response_payload'] = json.dumps(body, default=str)
-            log_vals['http_status'] = resp.status_code
-
-            if resp.status_code in (200, 201):
-                log_vals['status'] = 'success'
-                self.env['clover.transaction.log'].sudo().create(log_vals)
-                return body
-
-            error_msg = body.get('message') or resp.text[:500]
-            log_vals.update(status='error', error_message=error_msg)
-            self.env['clover.transaction.log'].sudo().create(log_vals)
-            raise UserError(_(
-                'Fiserv QR API %(status)s: %(msg)s',
-                status=resp.status_code, msg=error_msg,
-            ))
-        except requests.exceptions.Timeout:
-            log_vals.update(status='timeout', error_message='Request timed out')
-            self.env['clover.transaction.log'].sudo().create(log_vals)
-            raise UserError(_('Fiserv QR request timed out.'))
-        except requests.exceptions.ConnectionError:
-            log_vals.update(status='error', error_message='Connection refused')
-            self.env['clover.transaction.log'].sudo().create(log_vals)
-            raise UserError(_('Cannot reach Fiserv QR API. Check network.'))
-        except UserError:
-            raise
-        except Exception as exc:
-            _logger.exception('Fiserv QR API unexpected error')
-            log_vals.update(status='error', error_message=str(exc))
-            self.env['clover.transaction.log'].sudo().create(log_vals)
-            raise UserError(_('Fiserv QR error: %s', exc))
+        return self._api_complete(call, lambda: _http_send(call, timeout))
 
     def _fiserv_fetch_qr(self):
         """Fetch the static EMVCo QR string for the configured caja.
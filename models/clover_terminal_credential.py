@@ -0,0 +1,29 @@
+from odoo import fields, models
+
+
+class CloverTerminalCredential(models.Model):
+    """OAuth credentials of a clover.terminal, kept on a thin sibling record.
+
+    Tokens change far more often than the terminal configuration. Storing
+    them here keeps token writes off the mail.thread-tracked terminal.
+    """
+
+    _name = 'clover.terminal.credential'
+    _description = 'Clover Terminal OAuth Credential'
+    _rec_name = 'terminal_id'
+
+    terminal_id = fields.Many2one(
+        'clover.terminal',
+        string='Terminal',
+        required=True,
+        ondelete='cascade',
+        index=True,
+    )
+    api_token = fields.Char(string='API Access Token')
+    refresh_token = fields.Char(string='Refresh Token')
+    expires_at = fields.Datetime(string='Expires At')
+
+    _sql_constraints = [
+        ('unique_terminal', 'unique(terminal_id)',
+         'A terminal can only have one credential record.'),
+    ]
@@ -1,4 +1,10 @@
-from odoo import fields, models
+from datetime import timedelta
+
+from odoo import api, fields, models
+from odoo.tools.sql import create_index, drop_index, index_exists
+
+# Rows deleted per run of the retention clean-up
+_GC_BATCH_SIZE = 10000
 
 
 class CloverTransactionLog(models.Model):
@@ -11,9 +17,11 @@ class CloverTransactionLog(models.Model):
         'clover.terminal',
         string='Terminal',
         ondelete='set null',
-        index=True,
     )
     request_id = fields.Char(string='Request ID', index=True)
+    # Only set on rows claimed for a caller-supplied key (see
+    # clover.terminal._claim_idempotency_key), which the constraint guards
+    idempotency_key = fields.Char(string='Idempotency Key', index=True)
     endpoint = fields.Char(string='Endpoint')
     http_method = fields.Char(string='Method')
     http_status = fields.Integer(string='HTTP Status')
@@ -33,3 +41,55 @@ class CloverTransactionLog(models.Model):
     pos_order_id = fields.Many2one('pos.order', string='POS Order', ondelete='set null')
     pos_session_id = fields.Many2one('pos.session', string='POS Session', ondelete='set null')
     clover_payment_id = fields.Char(string='Clover Payment ID', index=True)
+
+    _sql_constraints = [
+        ('unique_idempotency_key', 'unique(terminal_id, idempotency_key)',
+         'This idempotency key was already used for this terminal.'),
+    ]
+
+    def init(self):
+        """Indexes for a terminal's recent calls and the tail of failed ones.
+
+        The composite index leads with terminal_id, so it also serves the
+        FK lookups; the former single-column index is dropped. Checked
+        first: DROP INDEX takes an exclusive lock even when there is nothing
+        to drop, and init() runs on every install and upgrade.
+        """
+        legacy_index = 'clover_transaction_log__terminal_id_index'
+        if index_exists(self.env.cr, legacy_index):
+            drop_index(self.env.cr, legacy_index, self._table)
+        create_index(
+            self.env.cr, 'clover_transaction_log_terminal_date_idx',
+            self._table, ['terminal_id', 'create_date DESC'],
+        )
+        create_index(
+            self.env.cr, 'clover_transaction_log_failed_idx',
+            self._table, ['create_date DESC'],
+            where="status IN ('error', 'timeout')",
+        )
+
+    @api.autovacuum
+    def _gc_expired_logs(self):
+        """Delete rows older than the retention period (daily autovacuum).
+
+        Days come from 'clover_terminal_integration.log_retention_days'
+        (default 90; 0 keeps everything). One batch per run, so a large
+        backlog (e.g. the first run on an existing install) never sits in
+        a single transaction; the cron is re-triggered while rows remain.
+        """
+        days = self.env['ir.config_parameter'].sudo().get_param(
+            'clover_terminal_integration.log_retention_days', '90')
+        try:
+            days = int(days)
+        except ValueError:
+            days = 90
+        if days <= 0:
+            return
+        cutoff = fields.Datetime.now() - timedelta(days=days)
+        # One row past the batch tells whether another run is needed
+        expired = self.sudo().search(
+            [('create_date', '<', cutoff)], limit=_GC_BATCH_SIZE + 1)
+        batch = expired[:_GC_BATCH_SIZE]
+        batch.unlink()
+        self.env['ir.cron']._notify_progress(
+            done=len(batch), remaining=len(expired) - len(batch))
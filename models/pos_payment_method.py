@@ -1,17 +1,11 @@
 import json
+import os
 import time
-import uuid
 
 from odoo import api, fields, models, _
 from odoo.exceptions import UserError
 
-# Clover environment → server URL for SDK WebSocket connection
-_CLOVER_SDK_SERVERS = {
-    'sandbox': 'https://sandbox.dev.clover.com',
-    'production_na': 'https://www.clover.com',
-    'production_eu': 'https://www.eu.clover.com',
-    'production_la': 'https://www.la.clover.com',
-}
+from .clover_terminal import CLOVER_ENV
 
 # Fiserv QR payment order status id → POS-facing state
 _FISERV_STATUS_MAP = {
@@ -90,13 +84,15 @@ class PosPaymentMethod(models.Model):
             return {'error': _('No API token. Click Authorize on the terminal first.')}
         if not terminal.clover_device_id:
             return {'error': _('No device ID. Click Test Connection on the terminal first.')}
+        # The SDK's WebSocket connection goes to the environment's web host
+        urls = CLOVER_ENV.get(terminal.environment)
         return {
-            'accessToken': terminal.api_token,
+            'accessToken': terminal._current_api_token(),
             'merchantId': terminal.merchant_id,
             'deviceId': terminal.clover_device_id,
             'deviceSerial': terminal.device_serial,
             'applicationId': terminal.raid,
-            'cloverServer': _CLOVER_SDK_SERVERS.get(terminal.environment, ''),
+            'cloverServer': urls.web_base if urls else '',
             'friendlyId': f'odoo-pos-{self.env.company.id}',
         }
 
@@ -147,7 +143,7 @@ class PosPaymentMethod(models.Model):
         terminal = self._get_clover_terminal()
         try:
             qr_string = terminal.fiserv_qr_string or terminal._fiserv_fetch_qr()
-            reference = f'{order_uid}-{uuid.uuid4().hex[:12]}'
+            reference = f'{order_uid}-{os.urandom(6).hex()}'
             order_uuid = terminal._fiserv_create_payment_order(
                 amount, reference,
                 notification_url=self._fiserv_webhook_url(),
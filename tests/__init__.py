@@ -0,0 +1,2 @@
+from . import test_idempotency
+from . import test_token_refresh
@@ -0,0 +1,54 @@
+import json
+from unittest.mock import MagicMock, patch
+
+from odoo.tests.common import TransactionCase
+
+
+def clover_response(status_code, body=None):
+    """Stand-in for a requests/httpx response carrying a JSON ``body``."""
+    content = json.dumps(body).encode() if body is not None else b''
+    return MagicMock(
+        status_code=status_code,
+        content=content,
+        text=content.decode(),
+        headers={'Content-Type': 'application/json'},
+    )
+
+
+class CloverTerminalCase(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.terminal = cls.env['clover.terminal'].create({
+            'name': 'Test Flex',
+            'environment': 'sandbox',
+            'merchant_id': 'MERCHANT1',
+            'device_serial': 'C000TEST0001',
+            'app_id': 'APP1',
+            'app_secret': 'SECRET1',
+            'raid': 'RAID1',
+        })
+
+    def setUp(self):
+        super().setUp()
+        # Autonomous cursors (token refresh, error log rows) share the test
+        # transaction instead of opening a second connection
+        self.registry.enter_test_mode(self.cr)
+        self.addCleanup(self.registry.leave_test_mode)
+        # Every call goes through the requests session mocked below
+        patcher = patch(
+            'odoo.addons.clover_terminal_integration.models.clover_terminal'
+            '._get_httpx_client', return_value=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.session = MagicMock()
+        patcher = patch.object(type(self.terminal), '_get_session',
+                               return_value=self.session)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def credential(self):
+        """The terminal's credential, re-read from the database."""
+        self.env.invalidate_all()
+        return self.terminal.sudo().credential_id
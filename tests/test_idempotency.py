@@ -0,0 +1,91 @@
+import json
+
+from odoo.exceptions import UserError
+from odoo.tests import tagged
+from odoo.tools import mute_logger
+
+from .common import CloverTerminalCase, clover_response
+
+ENDPOINT = '/v3/merchants/MERCHANT1/orders'
+
+
+@tagged('post_install', '-at_install')
+class TestIdempotencyClaim(CloverTerminalCase):
+
+    def setUp(self):
+        super().setUp()
+        self.terminal._write_credential({'api_token': 'TOKEN1'})
+        self.Log = self.env['clover.transaction.log']
+
+    def _post(self, key):
+        return self.terminal._api_request(
+            'POST', ENDPOINT, {'total': 100}, idempotency_key=key)
+
+    def _rows(self, key):
+        return self.Log.search([
+            ('terminal_id', '=', self.terminal.id),
+            ('idempotency_key', '=', key),
+        ])
+
+    def test_claim_stores_full_body(self):
+        # Larger than the 1 KiB audit limit: the replay needs all of it
+        body = {'id': 'ORDER1', 'note': 'x' * 4000}
+        self.session.request.return_value = clover_response(200, body)
+
+        self.assertEqual(self._post('KEY1'), body)
+
+        row = self._rows('KEY1')
+        self.assertEqual(row.status, 'success')
+        self.assertEqual(json.loads(row.response_payload), body)
+        headers = self.session.request.call_args.kwargs['headers']
+        self.assertEqual(headers['Idempotency-Key'], 'KEY1')
+
+    @mute_logger('odoo.sql_db')
+    def test_replay_returns_recorded_body(self):
+        body = {'id': 'ORDER1', 'note': 'x' * 4000}
+        self.session.request.return_value = clover_response(200, body)
+        self._post('KEY1')
+
+        self.assertEqual(self._post('KEY1'), body)
+        self.assertEqual(self.session.request.call_count, 1)
+        self.assertEqual(len(self._rows('KEY1')), 1)
+
+    @mute_logger('odoo.sql_db')
+    def test_key_in_progress(self):
+        self.Log.create({
+            'terminal_id': self.terminal.id,
+            'request_id': 'other-worker',
+            'endpoint': ENDPOINT,
+            'http_method': 'POST',
+            'idempotency_key': 'KEY1',
+            'status': 'pending',
+        })
+        with self.assertRaisesRegex(UserError, 'in progress'):
+            self._post('KEY1')
+        self.session.request.assert_not_called()
+
+    def test_failure_releases_key(self):
+        self.session.request.return_value = clover_response(
+            500, {'message': 'boom'})
+        with self.assertRaises(UserError):
+            self._post('KEY1')
+
+        self.assertFalse(self._rows('KEY1'))
+        error = self.Log.search([
+            ('terminal_id', '=', self.terminal.id),
+            ('status', '=', 'error'),
+        ])
+        self.assertEqual(len(error), 1)
+        self.assertFalse(error.idempotency_key)
+
+        # the retry with the same key goes out again and claims it
+        self.session.request.return_value = clover_response(200, {'id': 'O1'})
+        self.assertEqual(self._post('KEY1'), {'id': 'O1'})
+        self.assertEqual(self.session.request.call_count, 2)
+        self.assertEqual(self._rows('KEY1').status, 'success')
+
+    def test_no_key_is_stored_without_an_explicit_one(self):
+        self.session.request.return_value = clover_response(200, {'id': 'O1'})
+        self.terminal._api_request('POST', ENDPOINT, {'total': 100})
+        headers = self.session.request.call_args.kwargs['headers']
+        self.assertNotIn('Idempotency-Key', headers)
@@ -0,0 +1,137 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from odoo import fields
+from odoo.exceptions import UserError
+from odoo.tests import tagged
+
+from .common import CloverTerminalCase, clover_response
+
+
+@tagged('post_install', '-at_install')
+class TestTokenRefresh(CloverTerminalCase):
+
+    def _set_credential(self, expires_in, refresh_token='REFRESH1'):
+        self.terminal._write_credential({
+            'api_token': 'TOKEN1',
+            'refresh_token': refresh_token,
+            'expires_at': fields.Datetime.now() + expires_in,
+        })
+        # the refresh reads the row with raw SQL
+        self.env.flush_all()
+
+    def _refreshed(self):
+        return clover_response(200, {
+            'access_token': 'TOKEN2',
+            'refresh_token': 'REFRESH2',
+            'access_token_expiration': 4102444800,
+        })
+
+    def test_expiring_token_refreshed_before_use(self):
+        self._set_credential(timedelta(minutes=1))
+        self.session.post.return_value = self._refreshed()
+
+        self.assertEqual(self.terminal._current_api_token(), 'TOKEN2')
+
+        self.session.post.assert_called_once()
+        url = self.session.post.call_args.args[0]
+        self.assertTrue(url.endswith('/oauth/v2/refresh'))
+        self.assertEqual(self.session.post.call_args.kwargs['json'], {
+            'client_id': 'APP1', 'refresh_token': 'REFRESH1',
+        })
+        credential = self.credential()
+        self.assertEqual(credential.api_token, 'TOKEN2')
+        # refresh tokens rotate: the new one must be the one stored
+        self.assertEqual(credential.refresh_token, 'REFRESH2')
+        self.assertEqual(credential.expires_at.year, 2100)
+
+    def test_valid_token_not_refreshed(self):
+        self._set_credential(timedelta(hours=1))
+        self.assertEqual(self.terminal._current_api_token(), 'TOKEN1')
+        self.session.post.assert_not_called()
+
+    def test_token_replaced_by_another_worker(self):
+        """Under the row lock, a token no longer matching ours is reused."""
+        self._set_credential(timedelta(minutes=1))
+        self.assertEqual(
+            self.terminal._refresh_api_token('TOKEN0', force=True), 'TOKEN1')
+        self.session.post.assert_not_called()
+
+    def test_not_yet_expiring_token_kept_without_force(self):
+        """A concurrent worker refreshed while we waited for the lock."""
+        self._set_credential(timedelta(hours=1))
+        self.assertEqual(self.terminal._refresh_api_token('TOKEN1'), 'TOKEN1')
+        self.session.post.assert_not_called()
+
+    def test_failed_refresh_keeps_credential(self):
+        self._set_credential(timedelta(minutes=1))
+        self.session.post.return_value = clover_response(
+            400, {'message': 'invalid refresh token'})
+
+        self.assertFalse(self.terminal._refresh_api_token('TOKEN1'))
+        self.assertEqual(self.terminal._current_api_token(), 'TOKEN1')
+        credential = self.credential()
+        self.assertEqual(credential.api_token, 'TOKEN1')
+        self.assertEqual(credential.refresh_token, 'REFRESH1')
+
+    def test_401_refreshes_and_replays_once(self):
+        self._set_credential(timedelta(hours=1))
+        self.session.post.return_value = self._refreshed()
+        self.session.request.side_effect = [
+            clover_response(401, {'message': 'expired'}),
+            clover_response(200, {'name': 'Shop'}),
+        ]
+
+        body = self.terminal._api_request('GET', '/v3/merchants/MERCHANT1')
+
+        self.assertEqual(body, {'name': 'Shop'})
+        self.session.post.assert_called_once()
+        first, replay = self.session.request.call_args_list
+        self.assertEqual(first.kwargs['headers']['Authorization'],
+                         'Bearer TOKEN1')
+        self.assertEqual(replay.kwargs['headers']['Authorization'],
+                         'Bearer TOKEN2')
+
+    def test_401_without_refresh_token_skips_refresh(self):
+        """Legacy tokens have nothing to refresh: no locked lookup at all."""
+        self._set_credential(timedelta(hours=1), refresh_token=False)
+        self.session.request.return_value = clover_response(
+            401, {'message': 'revoked'})
+
+        with patch.object(type(self.terminal), '_refresh_api_token') as refresh, \
+                self.assertRaises(UserError):
+            self.terminal._api_request('GET', '/v3/merchants/MERCHANT1')
+        refresh.assert_not_called()
+        self.assertEqual(self.session.request.call_count, 1)
+
+    def test_refreshed_token_kept_for_the_transaction(self):
+        """The caller's snapshot still shows the old row after a refresh."""
+        self._set_credential(timedelta(minutes=1))
+        self.session.post.return_value = self._refreshed()
+        self.assertEqual(self.terminal._current_api_token(), 'TOKEN2')
+
+        with patch.object(type(self.terminal), '_refresh_api_token') as refresh:
+            self.assertEqual(self.terminal._current_api_token(), 'TOKEN2')
+        refresh.assert_not_called()
+
+    def test_401_replayed_for_concurrent_calls(self):
+        """``_api_request_many`` (cached GETs, online checks) reauths too."""
+        self._set_credential(timedelta(hours=1))
+        self.session.post.return_value = self._refreshed()
+
+        def request(method, url, headers, **kwargs):
+            if headers['Authorization'] == 'Bearer TOKEN1':
+                return clover_response(401, {'message': 'expired'})
+            return clover_response(200, {'url': url})
+        self.session.request.side_effect = request
+
+        merchant, device = self.terminal._cached_get_many([
+            '/v3/merchants/MERCHANT1',
+            '/v3/merchants/MERCHANT1/devices/DEVICE1',
+        ])
+
+        self.assertTrue(merchant['url'].endswith('/v3/merchants/MERCHANT1'))
+        self.assertTrue(device['url'].endswith('/devices/DEVICE1'))
+        # one refresh serves both calls: the second finds TOKEN2 under lock
+        self.session.post.assert_called_once()
+        self.assertEqual(self.session.request.call_count, 4)